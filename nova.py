@@ -1,63 +1,84 @@
 import speech_recognition as sr
-import pyttsx3
 import os
 import webbrowser
 import pyautogui
 import datetime
 import psutil
-import logging
-import json
-
-# ---------------- CONFIG ----------------
-
-COMMANDS_FILE = "learned_commands.json"
-
-logging.basicConfig(
-    filename="nova_log.txt",
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
+import atexit
+import sys
+
+from nova_text import build_trigger_trie, index_learned_trigger, find_trie_trigger
+from nova_core import (
+    start_logging, log_interaction, Speaker, recognizer, get_speech_client,
+    listen_streaming, transcribe, calibrate_microphone, recalibrate_if_due,
+    start_recalibration_timer, recalibration_due, capture_screenshot,
 )
+from nova_store import LearnedCommandStore
 
-engine = pyttsx3.init()
-recognizer = sr.Recognizer()
+start_logging()
 
 # ---------------- UTILITIES ----------------
 
-def log_interaction(entity, message):
-    logging.info(f"{entity}: {message}")
-    print(f"{entity}: {message}")
+speaker = Speaker()
 
 def speak(text):
+    # Queue the phrase and return, so the command runs while Nova talks
     log_interaction("Nova", text)
-    engine.say(text)
-    engine.runAndWait()
+    speaker.say(text)
+
+def wait_until_spoken():
+    speaker.wait()
+
+def is_complete_wake_command(transcript):
+    # A stable partial can run early only if the words after "nova" already
+    # name a command; search and play wait for their full argument
+    words = transcript.lower().split()
+    if "nova" not in words[:-1]:
+        return False
+    cmd = " ".join(words[words.index("nova") + 1:])
+    if find_learned_trigger(cmd):
+        return True
+    handler = find_builtin_handler(cmd)
+    return handler is not None and handler not in (search_google, play_youtube)
 
 def listen():
+    # Finish speaking first so the microphone does not pick up Nova itself
+    wait_until_spoken()
+
+    client = get_speech_client()
+    if client:
+        print("\nListening...")
+        try:
+            text = listen_streaming(client, is_complete_wake_command).lower()
+        except Exception as e:
+            log_interaction("System", f"Recognition service error: {e}")
+            return ""
+        if text:
+            log_interaction("User", text)
+        return text
+
     with sr.Microphone() as source:
         print("\nListening...")
-        recognizer.adjust_for_ambient_noise(source, duration=1)
+        recalibrate_if_due(source)
         audio = recognizer.listen(source)
         try:
-            text = recognizer.recognize_google(audio).lower()
+            text = transcribe(audio).lower()
             log_interaction("User", text)
             return text
+        except sr.UnknownValueError:
+            recalibration_due.set()
+            return ""
         except:
             return ""
 
 # ---------------- LEARNING MODE ----------------
 
-def load_learned_commands():
-    if not os.path.exists(COMMANDS_FILE):
-        return {}
-    with open(COMMANDS_FILE, "r") as f:
-        return json.load(f)
+learned_store = LearnedCommandStore()
+learned_commands = learned_store.load(on_error=lambda message: log_interaction("System", message))
+atexit.register(learned_store.consolidate)
 
-def save_learned_commands(commands):
-    with open(COMMANDS_FILE, "w") as f:
-        json.dump(commands, f, indent=4)
-
-learned_commands = load_learned_commands()
+# Word-level trie over learned triggers, kept in step by learning_mode
+trigger_trie = build_trigger_trie(learned_commands)
 
 def learning_mode():
     speak("Learning mode activated. What should I listen for?")
@@ -74,13 +95,116 @@ def learning_mode():
         speak("I didn't hear the action.")
         return
 
-    learned_commands[trigger] = action
-    save_learned_commands(learned_commands)
+    learned_store.learn(trigger, action)
+    index_learned_trigger(trigger_trie, trigger)
 
     speak(f"I have learned the command {trigger}")
 
 # ---------------- COMMAND PROCESSOR ----------------
 
+# Bound once so handlers skip the module attribute lookups on each call
+now = datetime.datetime.now
+sensors_battery = psutil.sensors_battery
+
+def open_chrome(cmd):
+    speak("Opening Chrome")
+    os.startfile("C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe")
+
+def open_spotify(cmd):
+    speak("Opening Spotify")
+    try:
+        os.system("start spotify")
+    except:
+        webbrowser.open("https://open.spotify.com")
+
+def open_gmail(cmd):
+    speak("Opening Gmail")
+    webbrowser.open("https://mail.google.com")
+
+def tell_time(cmd):
+    current_time = now().strftime("%I:%M %p")
+    speak(f"The time is {current_time}")
+
+def report_battery(cmd):
+    battery = sensors_battery()
+    if battery:
+        status = "plugged in" if battery.power_plugged else "not plugged in"
+        speak(f"Battery is at {battery.percent} percent and {status}")
+    else:
+        speak("Battery info unavailable")
+
+def search_google(cmd):
+    query = cmd.replace("search", "").strip()
+    if not query:
+        speak("What should I search?")
+        query = listen()
+    if query:
+        webbrowser.open(f"https://www.google.com/search?q={query}")
+        speak(f"Searching {query}")
+
+def play_youtube(cmd):
+    query = cmd.replace("play", "").strip()
+    if query:
+        webbrowser.open(f"https://www.youtube.com/results?search_query={query}")
+        speak(f"Playing {query}")
+
+def take_screenshot(cmd):
+    speak("Taking screenshot")
+    capture_screenshot(f"screenshot_{now().strftime('%Y%m%d_%H%M%S')}.png")
+    speak("Screenshot saved")
+
+def volume_up(cmd):
+    pyautogui.press("volumeup")
+
+def volume_down(cmd):
+    pyautogui.press("volumedown")
+
+def toggle_mute(cmd):
+    pyautogui.press("volumemute")
+
+def close_window(cmd):
+    pyautogui.hotkey("alt", "f4")
+
+def shutdown_pc(cmd):
+    speak("Are you sure?")
+    if "yes" in listen():
+        speak("Shutting down")
+        wait_until_spoken()
+        os.system("shutdown /s /t 5")
+
+def stop_nova(cmd):
+    speak("Goodbye")
+    wait_until_spoken()
+    sys.exit()
+
+# Built-in commands in priority order: (keywords, handler).
+# The first entry with any keyword found in the command wins.
+COMMAND_TABLE = [
+    (("open chrome",), open_chrome),
+    (("open spotify",), open_spotify),
+    (("open gmail", "write email"), open_gmail),
+    (("time",), tell_time),
+    (("battery",), report_battery),
+    (("search",), search_google),
+    (("play",), play_youtube),
+    (("screenshot",), take_screenshot),
+    (("volume up",), volume_up),
+    (("volume down",), volume_down),
+    (("mute",), toggle_mute),
+    (("close window",), close_window),
+    (("shutdown",), shutdown_pc),
+    (("stop nova", "exit"), stop_nova),
+]
+
+def find_learned_trigger(cmd):
+    return find_trie_trigger(trigger_trie, cmd)
+
+def find_builtin_handler(cmd):
+    for keywords, handler in COMMAND_TABLE:
+        if any(keyword in cmd for keyword in keywords):
+            return handler
+    return None
+
 def process_command(cmd):
     # --- Learning Mode ---
     if "learn new command" in cmd or "learning mode" in cmd:
@@ -88,93 +212,34 @@ def process_command(cmd):
         return
 
     # --- Learned Commands ---
-    for trigger, action in learned_commands.items():
-        if trigger in cmd:
-            speak(f"Executing learned command {trigger}")
-            if action.startswith("http"):
-                webbrowser.open(action)
-            else:
-                os.startfile(action)
-            return
+    trigger = find_learned_trigger(cmd)
+    if trigger:
+        action = learned_commands[trigger]
+        speak(f"Executing learned command {trigger}")
+        if action.startswith("http"):
+            webbrowser.open(action)
+        else:
+            os.startfile(action)
+        return
 
     # --- Built-in Commands ---
-    if "open chrome" in cmd:
-        speak("Opening Chrome")
-        os.startfile("C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe")
-
-    elif "open spotify" in cmd:
-        speak("Opening Spotify")
-        try:
-            os.system("start spotify")
-        except:
-            webbrowser.open("https://open.spotify.com")
-
-    elif "open gmail" in cmd or "write email" in cmd:
-        speak("Opening Gmail")
-        webbrowser.open("https://mail.google.com")
-
-    elif "time" in cmd:
-        current_time = datetime.datetime.now().strftime("%I:%M %p")
-        speak(f"The time is {current_time}")
-
-    elif "battery" in cmd:
-        battery = psutil.sensors_battery()
-        if battery:
-            status = "plugged in" if battery.power_plugged else "not plugged in"
-            speak(f"Battery is at {battery.percent} percent and {status}")
-        else:
-            speak("Battery info unavailable")
-
-    elif "search" in cmd:
-        query = cmd.replace("search", "").strip()
-        if not query:
-            speak("What should I search?")
-            query = listen()
-        if query:
-            webbrowser.open(f"https://www.google.com/search?q={query}")
-            speak(f"Searching {query}")
-
-    elif "play" in cmd:
-        query = cmd.replace("play", "").strip()
-        if query:
-            webbrowser.open(f"https://www.youtube.com/results?search_query={query}")
-            speak(f"Playing {query}")
-
-    elif "screenshot" in cmd:
-        speak("Taking screenshot")
-        img = pyautogui.screenshot()
-        filename = f"screenshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        img.save(filename)
-        speak("Screenshot saved")
-
-    elif "volume up" in cmd:
-        pyautogui.press("volumeup")
-
-    elif "volume down" in cmd:
-        pyautogui.press("volumedown")
-
-    elif "mute" in cmd:
-        pyautogui.press("volumemute")
-
-    elif "close window" in cmd:
-        pyautogui.hotkey("alt", "f4")
-
-    elif "shutdown" in cmd:
-        speak("Are you sure?")
-        if "yes" in listen():
-            speak("Shutting down")
-            os.system("shutdown /s /t 5")
-
-    elif "stop nova" in cmd or "exit" in cmd:
-        speak("Goodbye")
-        exit()
+    handler = find_builtin_handler(cmd)
+    if handler:
+        handler(cmd)
+        return
 
-    else:
-        speak("I don't know that yet. You can teach me.")
+    speak("I don't know that yet. You can teach me.")
 
 # ---------------- MAIN LOOP ----------------
 
 print("Nova Assistant Starting...")
+
+# Calibrate once up front instead of spending a second on it every turn;
+# streaming recognition endpoints on the server and needs no energy threshold
+if not get_speech_client():
+    calibrate_microphone()
+    start_recalibration_timer()
+
 speak("Nova is online and ready.")
 
 while True:
@@ -0,0 +1,334 @@
+"""
+Nova Assistant - Shared speech and system plumbing
+Logging, text-to-speech, speech recognition, microphone calibration and
+background file writes used by both nova.py and nova_fixed.py.
+
+Importing this module starts nothing: the log listener, the TTS engine,
+timers and service clients are only created when a script asks for them.
+"""
+
+import speech_recognition as sr
+import pyttsx3
+import pyautogui
+import os
+import json
+import logging
+import atexit
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    # Google Cloud streaming recognition; optional
+    from google.cloud import speech
+except ImportError:
+    speech = None
+
+try:
+    # Local offline speech recognition; optional
+    import vosk
+except ImportError:
+    vosk = None
+
+try:
+    # Native screen capture, much faster than pyautogui/PIL; optional
+    import mss
+    import mss.tools
+except ImportError:
+    mss = None
+
+# ---------------- CONFIG ----------------
+
+LOG_FILE = "nova_log.txt"
+
+# Offline recognition (needs vosk and a downloaded model)
+VOSK_MODEL_PATH = "models/vosk-model-small-en-us-0.15"
+
+# Streaming recognition settings (needs google-cloud-speech and credentials)
+STREAMING_RECOGNITION = True  # Use streaming when no local model is available
+SAMPLE_RATE = 16000           # Hz, 16-bit mono audio for recognition
+CHUNK_DURATION = 0.1          # Seconds of audio per streaming request
+MAX_STREAM_SECONDS = 15       # Give up on a streamed turn after this long
+INTERIM_STABILITY = 0.9       # Stable interim results can be dispatched early
+
+# Ambient noise calibration
+CALIBRATION_DURATION = 1       # Seconds of noise sampled at startup
+RECALIBRATION_DURATION = 0.5   # Shorter re-sample between turns
+RECALIBRATE_INTERVAL = 300     # Seconds between periodic recalibrations
+STABLE_ENERGY_RATIO = 0.1      # Thresholds within 10% of each other are stable
+
+# Speech output
+SPEECH_BATCH_WINDOW = 0.02     # Seconds to wait for more phrases to speak together
+
+# ---------------- LOGGING ----------------
+
+def start_logging():
+    """
+    Route logging through a queue so a background thread writes the log
+    file, and logging never blocks between hearing the user and answering.
+    """
+    log_queue = queue.Queue(-1)
+    log_file_handler = logging.FileHandler(LOG_FILE)
+    log_file_handler.setFormatter(logging.Formatter(
+        "%(asctime)s - %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    ))
+    log_listener = QueueListener(log_queue, log_file_handler, respect_handler_level=True)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+
+    # The file handler adds the timestamp; queued records carry the bare message
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(message)s",
+        handlers=[QueueHandler(log_queue)]
+    )
+
+def log_interaction(entity, message):
+    logging.info(f"{entity}: {message}")
+    print(f"{entity}: {message}")
+
+# ---------------- SPEECH OUTPUT ----------------
+
+class Speaker:
+    """
+    Text-to-speech on one persistent background engine.
+    Phrases queued in quick succession are spoken with a single runAndWait(),
+    saving a driver round-trip for each extra line.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.ready = threading.Event()
+        self.init_error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+        # Fail at startup, not later as a silent hang in wait()
+        self.ready.wait()
+        if self.init_error:
+            raise self.init_error
+
+    def say(self, text):
+        self.queue.put(text)
+
+    def wait(self):
+        self.queue.join()
+
+    def _run(self):
+        # pyttsx3 engines must be driven from the thread that created them
+        try:
+            engine = pyttsx3.init()
+        except Exception as e:
+            self.init_error = e
+            return
+        finally:
+            self.ready.set()
+
+        while True:
+            batch = [self.queue.get()]
+            try:
+                while True:
+                    batch.append(self.queue.get(timeout=SPEECH_BATCH_WINDOW))
+            except queue.Empty:
+                pass
+
+            try:
+                for text in batch:
+                    engine.say(text)
+                engine.runAndWait()
+            except Exception as e:
+                log_interaction("System", f"Speech error: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+# ---------------- SPEECH RECOGNITION ----------------
+
+recognizer = sr.Recognizer()
+
+def get_vosk_model():
+    """
+    Load the local Vosk model once.
+    Returns None when vosk or the model is not installed.
+    """
+    if not hasattr(get_vosk_model, 'model'):
+        get_vosk_model.model = None
+        if vosk and os.path.isdir(VOSK_MODEL_PATH):
+            vosk.SetLogLevel(-1)
+            try:
+                get_vosk_model.model = vosk.Model(VOSK_MODEL_PATH)
+            except Exception as e:
+                log_interaction("System", f"Offline recognition unavailable: {e}")
+    return get_vosk_model.model
+
+def get_speech_client():
+    """
+    Create the Google Cloud speech client once.
+    Returns None when streaming recognition is disabled or unavailable,
+    or when a local Vosk model makes the network round-trip unnecessary.
+    """
+    if not hasattr(get_speech_client, 'client'):
+        get_speech_client.client = None
+        if STREAMING_RECOGNITION and speech and not get_vosk_model():
+            try:
+                get_speech_client.client = speech.SpeechClient()
+            except Exception as e:
+                log_interaction("System", f"Streaming recognition unavailable: {e}")
+    return get_speech_client.client
+
+def mic_chunks(source, stop_event, read_lock):
+    """
+    Yield raw microphone audio one chunk at a time until stopped.
+    Each read holds read_lock, so the caller can take the lock to wait
+    out a read in progress before closing the stream.
+    """
+    for _ in range(int(MAX_STREAM_SECONDS / CHUNK_DURATION)):
+        with read_lock:
+            if stop_event.is_set():
+                return
+            chunk = source.stream.read(source.CHUNK)
+        yield chunk
+
+def listen_streaming(client, is_complete_command):
+    """
+    Stream microphone audio to Google and return the transcript of the
+    final result, or of an earlier stable interim result for which
+    is_complete_command(transcript) is true. Returns "" when nothing was
+    recognized. Service errors propagate to the caller, and later turns
+    fall back to recognizer.listen().
+    """
+    config = speech.StreamingRecognitionConfig(
+        config=speech.RecognitionConfig(
+            encoding=speech.RecognitionConfig.AudioEncoding.LINEAR16,
+            sample_rate_hertz=SAMPLE_RATE,
+            language_code="en-US",
+        ),
+        interim_results=True,
+        single_utterance=True,
+    )
+    stop_event = threading.Event()
+    read_lock = threading.Lock()
+    chunk_size = int(SAMPLE_RATE * CHUNK_DURATION)
+
+    with sr.Microphone(sample_rate=SAMPLE_RATE, chunk_size=chunk_size) as source:
+        requests = (
+            speech.StreamingRecognizeRequest(audio_content=chunk)
+            for chunk in mic_chunks(source, stop_event, read_lock)
+        )
+        responses = None
+
+        try:
+            responses = client.streaming_recognize(config=config, requests=requests)
+            for response in responses:
+                for result in response.results:
+                    if not result.alternatives:
+                        continue
+                    transcript = result.alternatives[0].transcript
+                    if result.is_final or (result.stability >= INTERIM_STABILITY
+                                           and is_complete_command(transcript)):
+                        return transcript.strip()
+        except Exception:
+            # Bad credentials, quotas or no network fail again straight away;
+            # recognizer.listen() at least waits for the user to speak first
+            get_speech_client.client = None
+            recalibration_due.set()
+            raise
+        finally:
+            # gRPC reads mic_chunks on its own thread: stop it and wait for
+            # any read in progress before the microphone stream is closed
+            with read_lock:
+                stop_event.set()
+            if responses is not None:
+                responses.cancel()
+
+    return ""
+
+def transcribe(audio):
+    """
+    Recognize captured audio in-process with Vosk when a model is installed,
+    otherwise with Google's web API.
+    """
+    model = get_vosk_model()
+    if not model:
+        return recognizer.recognize_google(audio)
+
+    rec = vosk.KaldiRecognizer(model, SAMPLE_RATE)
+    rec.AcceptWaveform(audio.get_raw_data(convert_rate=SAMPLE_RATE, convert_width=2))
+    text = json.loads(rec.FinalResult()).get("text", "")
+    if not text:
+        raise sr.UnknownValueError()
+    return text
+
+# ---------------- CALIBRATION ----------------
+
+energy_history = deque(maxlen=3)  # Recent calibrated energy thresholds
+recalibration_due = threading.Event()
+
+def calibrate(source, duration):
+    """
+    Re-sample ambient noise and record the resulting energy threshold.
+    Once recent calibrations agree, stop re-estimating energy on every chunk.
+    """
+    recognizer.adjust_for_ambient_noise(source, duration=duration)
+    energy_history.append(recognizer.energy_threshold)
+
+    if len(energy_history) == energy_history.maxlen:
+        low, high = min(energy_history), max(energy_history)
+        recognizer.dynamic_energy_threshold = high - low > high * STABLE_ENERGY_RATIO
+
+def calibrate_microphone():
+    with sr.Microphone() as source:
+        print("📊 Calibrating for ambient noise...")
+        calibrate(source, CALIBRATION_DURATION)
+
+def recalibrate_if_due(source):
+    """
+    Refresh the calibration when the timer or a failed recognition asked for it.
+    """
+    if recalibration_due.is_set():
+        recalibration_due.clear()
+        print("📊 Recalibrating for ambient noise...")
+        calibrate(source, RECALIBRATION_DURATION)
+
+def start_recalibration_timer():
+    """
+    Flag a recalibration every RECALIBRATE_INTERVAL seconds.
+    listen() runs it before the next turn, while the room is quiet.
+    """
+    def on_timer():
+        recalibration_due.set()
+        start_recalibration_timer()
+
+    timer = threading.Timer(RECALIBRATE_INTERVAL, on_timer)
+    timer.daemon = True
+    timer.start()
+
+# ---------------- FILE WRITES ----------------
+
+# Encodes and writes files off the main loop; finishes pending work at exit
+file_writer = ThreadPoolExecutor(max_workers=1)
+
+def save_in_background(save, *args, **kwargs):
+    def report_error(future):
+        if future.exception():
+            log_interaction("System", f"Save error: {future.exception()}")
+
+    file_writer.submit(save, *args, **kwargs).add_done_callback(report_error)
+
+def capture_screenshot(filename):
+    """
+    Capture the primary screen now and write it to filename in the background.
+    """
+    # Only the capture blocks; PNG encoding happens on the file writer
+    if mss:
+        if not hasattr(capture_screenshot, 'grabber'):
+            capture_screenshot.grabber = mss.mss()
+        grabber = capture_screenshot.grabber
+        img = grabber.grab(grabber.monitors[1])
+        save_in_background(mss.tools.to_png, img.rgb, img.size, output=filename)
+    else:
+        img = pyautogui.screenshot()
+        save_in_background(img.save, filename)
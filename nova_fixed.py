@@ -1,36 +1,31 @@
 import speech_recognition as sr
-import pyttsx3
 import os
 import webbrowser
 import pyautogui
 import datetime
 import psutil
-import logging
-import json
-import re
-from difflib import SequenceMatcher
+import atexit
+import sys
 
-# ---------------- CONFIG ----------------
+from nova_text import (
+    normalize_text, is_valid_trigger, best_fuzzy_match, check_exit_command,
+    build_trigger_trie, index_learned_trigger, find_trie_trigger,
+)
+from nova_core import (
+    start_logging, log_interaction, Speaker, recognizer, get_speech_client,
+    listen_streaming, transcribe, calibrate_microphone, recalibrate_if_due,
+    start_recalibration_timer, recalibration_due, capture_screenshot,
+)
+from nova_store import LearnedCommandStore
 
-COMMANDS_FILE = "learned_commands.json"
+# ---------------- CONFIG ----------------
 
 # Recognition settings
-MIN_TRIGGER_LENGTH = 3  # Minimum characters for a trigger
-MIN_WORD_COUNT = 2      # Minimum words for learning triggers
 PHRASE_TIME_LIMIT = 5   # Max seconds to listen for a phrase
 PAUSE_THRESHOLD = 0.8   # Seconds of silence to consider phrase complete
 ENERGY_THRESHOLD = 300  # Minimum audio energy to consider as speech
-SIMILARITY_THRESHOLD = 0.75  # Fuzzy match threshold (0-1)
-
-logging.basicConfig(
-    filename="nova_log.txt",
-    level=logging.INFO,
-    format="%(asctime)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S"
-)
 
-engine = pyttsx3.init()
-recognizer = sr.Recognizer()
+start_logging()
 
 # Optimize recognizer settings
 recognizer.energy_threshold = ENERGY_THRESHOLD
@@ -39,104 +34,78 @@ recognizer.dynamic_energy_threshold = True
 
 # ---------------- UTILITIES ----------------
 
-def log_interaction(entity, message):
-    logging.info(f"{entity}: {message}")
-    print(f"{entity}: {message}")
+speaker = Speaker()
 
 def speak(text):
+    """
+    Queue text for speech and return immediately, so the command keeps
+    running while Nova talks.
+    """
     log_interaction("Nova", text)
-    engine.say(text)
-    engine.runAndWait()
+    speaker.say(text)
 
-def normalize_text(text):
+def wait_until_spoken():
     """
-    Normalize speech text for better matching.
-    - Convert to lowercase
-    - Remove extra whitespace
-    - Remove punctuation
-    - Standardize common variations
+    Block until every queued phrase has been spoken.
     """
-    if not text:
-        return ""
-    
-    # Convert to lowercase
-    text = text.lower().strip()
-    
-    # Remove punctuation except spaces
-    text = re.sub(r'[^\w\s]', '', text)
-    
-    # Collapse multiple spaces
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Common speech-to-text corrections
-    replacements = {
-        "whats": "what is",
-        "wheres": "where is",
-        "hows": "how is",
-        "im": "i am",
-        "youre": "you are",
-        "dont": "do not",
-        "cant": "can not",
-        "wont": "will not",
-    }
-    
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
-    return text.strip()
+    speaker.wait()
 
-def is_valid_trigger(trigger):
+def accept_transcript(text):
     """
-    Validate if a trigger phrase is acceptable for learning.
-    Returns (is_valid, error_message)
+    Log a recognized phrase and return its normalized form.
     """
-    trigger = trigger.strip()
-    
-    # Check minimum length
-    if len(trigger) < MIN_TRIGGER_LENGTH:
-        return False, f"Trigger too short. Minimum {MIN_TRIGGER_LENGTH} characters."
+    normalized = normalize_text(text)
     
-    # Check for digits only
-    if trigger.isdigit():
-        return False, "Trigger cannot be only numbers."
+    log_interaction("User (raw)", text)
+    if normalized != text.lower():
+        log_interaction("User (normalized)", normalized)
     
-    # Check word count
-    words = trigger.split()
-    if len(words) < MIN_WORD_COUNT:
-        return False, f"Trigger needs at least {MIN_WORD_COUNT} words."
-    
-    # Check for mostly numbers
-    digit_count = sum(c.isdigit() for c in trigger)
-    if digit_count > len(trigger) / 2:
-        return False, "Trigger contains too many numbers."
-    
-    # Check for common stop words only
-    stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at"}
-    if all(word in stop_words for word in words):
-        return False, "Trigger cannot be only common words."
-    
-    return True, ""
+    return normalized
 
-def fuzzy_match(text, pattern, threshold=SIMILARITY_THRESHOLD):
+def is_complete_wake_command(transcript):
     """
-    Check if text fuzzy matches pattern using sequence matching.
-    Returns True if similarity >= threshold.
+    Check if an interim transcript already holds "nova" plus a command
+    that can run as heard. Commands that take a trailing argument
+    (search, play) always wait for the final result.
     """
-    similarity = SequenceMatcher(None, text, pattern).ratio()
-    return similarity >= threshold
+    words = transcript.lower().split()
+    if "nova" not in words[:-1]:
+        return False
+    
+    cmd = normalize_text(" ".join(words[words.index("nova") + 1:]))
+    if check_exit_command(cmd) or find_learned_trigger(cmd):
+        return True
+    handler = find_builtin_handler(cmd)
+    return handler is not None and handler not in ARGUMENT_HANDLERS
 
 def listen():
     """
     Enhanced listening with better error handling and timeout.
+    Uses streaming recognition when available.
     """
+    # Finish speaking first so the microphone does not pick up Nova itself
+    wait_until_spoken()
+    
+    client = get_speech_client()
+    if client:
+        print("\n🎤 Listening...")
+        try:
+            text = listen_streaming(client, is_complete_wake_command)
+        except Exception as e:
+            log_interaction("System", f"Recognition service error: {e}")
+            speak("Streaming recognition failed. Switching to standard recognition.")
+            return ""
+        
+        if not text:
+            log_interaction("System", "Could not understand audio")
+            return ""
+        return accept_transcript(text)
+    
     with sr.Microphone() as source:
         print("\n🎤 Listening...")
         
-        # Only adjust for ambient noise on first call (cached)
-        if not hasattr(listen, 'calibrated'):
-            print("📊 Calibrating for ambient noise...")
-            recognizer.adjust_for_ambient_noise(source, duration=1)
-            listen.calibrated = True
+        # Calibrated once at startup; refresh when the timer or a failure asks
+        recalibrate_if_due(source)
         
         try:
             # Listen with timeout and phrase time limit
@@ -146,21 +115,15 @@ def listen():
                 phrase_time_limit=PHRASE_TIME_LIMIT
             )
             
-            # Recognize with Google
-            text = recognizer.recognize_google(audio)
-            normalized = normalize_text(text)
-            
-            log_interaction("User (raw)", text)
-            if normalized != text.lower():
-                log_interaction("User (normalized)", normalized)
-            
-            return normalized
+            text = transcribe(audio)
+            return accept_transcript(text)
             
         except sr.WaitTimeoutError:
             log_interaction("System", "Listening timeout - no speech detected")
             return ""
         except sr.UnknownValueError:
             log_interaction("System", "Could not understand audio")
+            recalibration_due.set()
             return ""
         except sr.RequestError as e:
             log_interaction("System", f"Recognition service error: {e}")
@@ -172,21 +135,12 @@ def listen():
 
 # ---------------- LEARNING MODE ----------------
 
-def load_learned_commands():
-    if not os.path.exists(COMMANDS_FILE):
-        return {}
-    try:
-        with open(COMMANDS_FILE, "r") as f:
-            return json.load(f)
-    except json.JSONDecodeError:
-        log_interaction("System", "Error loading learned commands - file corrupted")
-        return {}
+learned_store = LearnedCommandStore()
+learned_commands = learned_store.load(on_error=lambda message: log_interaction("System", message))
+atexit.register(learned_store.consolidate)
 
-def save_learned_commands(commands):
-    with open(COMMANDS_FILE, "w") as f:
-        json.dump(commands, f, indent=4)
-
-learned_commands = load_learned_commands()
+# Word-level trie over learned triggers, kept in step by learning_mode
+trigger_trie = build_trigger_trie(learned_commands)
 
 def learning_mode():
     """
@@ -219,27 +173,142 @@ def learning_mode():
         return
 
     # Store the command
-    learned_commands[trigger] = action
-    save_learned_commands(learned_commands)
+    learned_store.learn(trigger, action)
+    index_learned_trigger(trigger_trie, trigger)
 
     speak(f"Perfect! I have learned that {trigger} means {action}")
     log_interaction("System", f"Learned: '{trigger}' -> '{action}'")
 
 # ---------------- COMMAND PROCESSOR ----------------
 
-def check_exit_command(cmd):
+# --- Built-in command handlers ---
+
+# Bound once so handlers skip the module attribute lookups on each call
+now = datetime.datetime.now
+sensors_battery = psutil.sensors_battery
+
+def greet(cmd):
+    speak("Hello! How can I help you?")
+
+def tell_time(cmd):
+    current_time = now().strftime("%I:%M %p")
+    speak(f"The time is {current_time}")
+
+def tell_date(cmd):
+    current_date = now().strftime("%B %d, %Y")
+    speak(f"Today is {current_date}")
+
+def open_chrome(cmd):
+    speak("Opening Chrome")
+    try:
+        os.startfile("C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe")
+    except:
+        speak("Chrome not found at default location")
+
+def open_spotify(cmd):
+    speak("Opening Spotify")
+    try:
+        os.system("start spotify")
+    except:
+        webbrowser.open("https://open.spotify.com")
+
+def open_gmail(cmd):
+    speak("Opening Gmail")
+    webbrowser.open("https://mail.google.com")
+
+def report_battery(cmd):
+    battery = sensors_battery()
+    if battery:
+        status = "plugged in" if battery.power_plugged else "not plugged in"
+        speak(f"Battery is at {battery.percent} percent and {status}")
+    else:
+        speak("Battery info unavailable")
+
+def search_google(cmd):
+    query = cmd.replace("search", "").replace("google", "").strip()
+    if not query or len(query) < 2:
+        speak("What should I search for?")
+        query = listen()
+    if query:
+        webbrowser.open(f"https://www.google.com/search?q={query}")
+        speak(f"Searching for {query}")
+
+def play_youtube(cmd):
+    query = cmd.replace("play", "").strip()
+    if query and len(query) > 1:
+        webbrowser.open(f"https://www.youtube.com/results?search_query={query}")
+        speak(f"Playing {query}")
+    else:
+        speak("What should I play?")
+
+def take_screenshot(cmd):
+    speak("Taking screenshot")
+    capture_screenshot(f"screenshot_{now().strftime('%Y%m%d_%H%M%S')}.png")
+    speak("Screenshot saved")
+
+def volume_up(cmd):
+    pyautogui.press("volumeup")
+    speak("Volume increased")
+
+def volume_down(cmd):
+    pyautogui.press("volumedown")
+    speak("Volume decreased")
+
+def toggle_mute(cmd):
+    pyautogui.press("volumemute")
+
+def close_window(cmd):
+    pyautogui.hotkey("alt", "f4")
+
+def shutdown_pc(cmd):
+    speak("Are you sure you want to shut down?")
+    confirmation = listen()
+    if "yes" in confirmation or "sure" in confirmation or "ok" in confirmation:
+        speak("Shutting down in 5 seconds")
+        os.system("shutdown /s /t 5")
+    else:
+        speak("Shutdown cancelled")
+
+# Built-in dispatch table, checked in order (first match wins).
+# Each entry is (keyword groups, handler): a command matches when every
+# group has at least one of its keywords somewhere in the text.
+COMMAND_TABLE = [
+    ((("hello", "hi", "hey"),), greet),
+    ((("time",),), tell_time),
+    ((("date", "today"),), tell_date),
+    ((("chrome",), ("open",)), open_chrome),
+    ((("spotify",), ("open",)), open_spotify),
+    ((("gmail", "email"), ("open", "write")), open_gmail),
+    ((("battery",),), report_battery),
+    ((("search", "google"),), search_google),
+    ((("play",),), play_youtube),
+    ((("screenshot", "screen shot"),), take_screenshot),
+    ((("volume up", "increase volume"),), volume_up),
+    ((("volume down", "decrease volume"),), volume_down),
+    ((("mute", "unmute"),), toggle_mute),
+    ((("close window", "close this"),), close_window),
+    ((("shutdown", "shut down"),), shutdown_pc),
+]
+
+LEARNING_TRIGGERS = ["learn new command", "learning mode", "teach you", "learn something"]
+
+# Built-ins whose command text carries an argument that may still be spoken
+ARGUMENT_HANDLERS = {search_google, play_youtube}
+
+def find_builtin_handler(cmd):
     """
-    Check for exit/stop commands with multiple variations.
+    Return the handler of the first built-in command matching cmd, or None.
     """
-    exit_patterns = [
-        "stop", "exit", "quit", "goodbye", "bye", "shut down nova",
-        "stop nova", "nova stop", "close nova", "turn off"
-    ]
-    
-    for pattern in exit_patterns:
-        if pattern in cmd or fuzzy_match(cmd, pattern, 0.8):
-            return True
-    return False
+    for groups, handler in COMMAND_TABLE:
+        if all(any(keyword in cmd for keyword in group) for group in groups):
+            return handler
+    return None
+
+def find_learned_trigger(cmd):
+    """
+    Return the learned trigger contained in cmd, else the closest fuzzy match.
+    """
+    return find_trie_trigger(trigger_trie, cmd) or best_fuzzy_match(cmd, learned_commands.keys())
 
 def process_command(cmd):
     """
@@ -250,169 +319,85 @@ def process_command(cmd):
     # --- Exit Commands (highest priority) ---
     if check_exit_command(cmd):
         speak("Goodbye")
-        exit()
+        wait_until_spoken()
+        sys.exit()
     
     # --- Learning Mode ---
-    learning_triggers = ["learn new command", "learning mode", "teach you", "learn something"]
-    for trigger in learning_triggers:
-        if trigger in cmd or fuzzy_match(cmd, trigger):
-            learning_mode()
-            return
+    if any(trigger in cmd for trigger in LEARNING_TRIGGERS) or best_fuzzy_match(cmd, LEARNING_TRIGGERS):
+        learning_mode()
+        return
 
     # --- Learned Commands (check with fuzzy matching) ---
-    for trigger, action in learned_commands.items():
-        if trigger in cmd or fuzzy_match(cmd, trigger):
-            speak(f"Executing learned command")
-            log_interaction("System", f"Matched learned command: '{trigger}'")
-            try:
-                if action.startswith("http"):
-                    webbrowser.open(action)
-                else:
-                    os.startfile(action)
-            except Exception as e:
-                speak("Sorry, I couldn't execute that command.")
-                log_interaction("System", f"Execution error: {e}")
-            return
-
-    # --- Built-in Commands ---
-    
-    # Greetings
-    if any(word in cmd for word in ["hello", "hi", "hey"]):
-        speak("Hello! How can I help you?")
-    
-    # Time
-    elif "time" in cmd:
-        current_time = datetime.datetime.now().strftime("%I:%M %p")
-        speak(f"The time is {current_time}")
-    
-    # Date
-    elif "date" in cmd or "today" in cmd:
-        current_date = datetime.datetime.now().strftime("%B %d, %Y")
-        speak(f"Today is {current_date}")
-
-    # Open Chrome
-    elif "chrome" in cmd and "open" in cmd:
-        speak("Opening Chrome")
+    trigger = find_learned_trigger(cmd)
+    if trigger:
+        action = learned_commands[trigger]
+        speak(f"Executing learned command")
+        log_interaction("System", f"Matched learned command: '{trigger}'")
         try:
-            os.startfile("C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe")
-        except:
-            speak("Chrome not found at default location")
+            if action.startswith("http"):
+                webbrowser.open(action)
+            else:
+                os.startfile(action)
+        except Exception as e:
+            speak("Sorry, I couldn't execute that command.")
+            log_interaction("System", f"Execution error: {e}")
+        return
 
-    # Open Spotify
-    elif "spotify" in cmd and "open" in cmd:
-        speak("Opening Spotify")
-        try:
-            os.system("start spotify")
-        except:
-            webbrowser.open("https://open.spotify.com")
-
-    # Open Gmail
-    elif ("gmail" in cmd or "email" in cmd) and ("open" in cmd or "write" in cmd):
-        speak("Opening Gmail")
-        webbrowser.open("https://mail.google.com")
-
-    # Battery
-    elif "battery" in cmd:
-        battery = psutil.sensors_battery()
-        if battery:
-            status = "plugged in" if battery.power_plugged else "not plugged in"
-            speak(f"Battery is at {battery.percent} percent and {status}")
-        else:
-            speak("Battery info unavailable")
-
-    # Search
-    elif "search" in cmd or "google" in cmd:
-        query = cmd.replace("search", "").replace("google", "").strip()
-        if not query or len(query) < 2:
-            speak("What should I search for?")
-            query = listen()
-        if query:
-            webbrowser.open(f"https://www.google.com/search?q={query}")
-            speak(f"Searching for {query}")
-
-    # Play (YouTube)
-    elif "play" in cmd:
-        query = cmd.replace("play", "").strip()
-        if query and len(query) > 1:
-            webbrowser.open(f"https://www.youtube.com/results?search_query={query}")
-            speak(f"Playing {query}")
-        else:
-            speak("What should I play?")
-
-    # Screenshot
-    elif "screenshot" in cmd or "screen shot" in cmd:
-        speak("Taking screenshot")
-        img = pyautogui.screenshot()
-        filename = f"screenshot_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.png"
-        img.save(filename)
-        speak("Screenshot saved")
-
-    # Volume controls
-    elif "volume up" in cmd or "increase volume" in cmd:
-        pyautogui.press("volumeup")
-        speak("Volume increased")
-
-    elif "volume down" in cmd or "decrease volume" in cmd:
-        pyautogui.press("volumedown")
-        speak("Volume decreased")
-
-    elif "mute" in cmd or "unmute" in cmd:
-        pyautogui.press("volumemute")
-
-    # Window controls
-    elif "close window" in cmd or "close this" in cmd:
-        pyautogui.hotkey("alt", "f4")
-
-    # Shutdown
-    elif "shutdown" in cmd or "shut down" in cmd:
-        speak("Are you sure you want to shut down?")
-        confirmation = listen()
-        if "yes" in confirmation or "sure" in confirmation or "ok" in confirmation:
-            speak("Shutting down in 5 seconds")
-            os.system("shutdown /s /t 5")
-        else:
-            speak("Shutdown cancelled")
-
-    # Unknown command
+    # --- Built-in Commands ---
+    handler = find_builtin_handler(cmd)
+    if handler:
+        handler(cmd)
     else:
         speak("I don't know that command yet. You can teach me by saying learn new command.")
 
 # ---------------- MAIN LOOP ----------------
 
-print("=" * 50)
-print("🚀 Nova Assistant Starting...")
-print("=" * 50)
-speak("Nova is online and ready.")
+def main():
+    print("=" * 50)
+    print("🚀 Nova Assistant Starting...")
+    print("=" * 50)
 
-while True:
-    try:
-        command = listen()
-        
-        if not command:
-            continue
-        
-        # Check if command contains wake word "nova"
-        if "nova" in command:
-            # Remove wake word and process
-            cmd = command.replace("nova", "").strip()
+    # Streaming recognition endpoints on the server and needs no energy threshold
+    if not get_speech_client():
+        calibrate_microphone()
+        start_recalibration_timer()
+
+    speak("Nova is online and ready.")
+
+    while True:
+        try:
+            command = listen()
             
-            if not cmd:
-                speak("Yes?")
-                cmd = listen()
+            if not command:
+                continue
             
-            if cmd:
-                process_command(cmd)
-        else:
-            # If no wake word, check if it's a direct command (for convenience)
-            # This allows "exit" without saying "nova" first
-            if check_exit_command(command):
-                speak("Goodbye")
-                break
+            # Check if command contains wake word "nova"
+            if "nova" in command:
+                # Remove wake word and process
+                cmd = command.replace("nova", "").strip()
+                
+                if not cmd:
+                    speak("Yes?")
+                    cmd = listen()
                 
-    except KeyboardInterrupt:
-        speak("Shutting down")
-        log_interaction("System", "Shutdown via keyboard interrupt")
-        break
-    except Exception as e:
-        log_interaction("System", f"Main loop error: {e}")
-        continue
+                if cmd:
+                    process_command(cmd)
+            else:
+                # If no wake word, check if it's a direct command (for convenience)
+                # This allows "exit" without saying "nova" first
+                if check_exit_command(command):
+                    speak("Goodbye")
+                    break
+                    
+        except KeyboardInterrupt:
+            speak("Shutting down")
+            log_interaction("System", "Shutdown via keyboard interrupt")
+            break
+        except Exception as e:
+            log_interaction("System", f"Main loop error: {e}")
+            continue
+
+    wait_until_spoken()
+
+if __name__ == "__main__":
+    main()
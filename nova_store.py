@@ -0,0 +1,115 @@
+"""
+Nova Assistant - Learned command storage
+Learned commands live in memory as a dict. On disk they are a JSON
+snapshot plus an NDJSON log of commands learned since it was written.
+
+Only the standard library (and orjson, when installed) is used, and
+nothing touches the disk until a store is loaded, so the storage logic
+can be tested without a microphone or speech engine.
+"""
+
+import os
+import json
+
+try:
+    # Rust JSON parser, faster than the json module; optional
+    import orjson
+except ImportError:
+    orjson = None
+
+# ---------------- CONFIG ----------------
+
+COMMANDS_FILE = "learned_commands.json"
+LEARNED_LOG_FILE = "learned_commands.ndjson"  # Commands learned since the last snapshot
+SNAPSHOT_EVERY = 20  # Rewrite the snapshot after this many newly learned commands
+
+# ---------------- JSON ----------------
+
+def json_loads(data):
+    return orjson.loads(data) if orjson else json.loads(data)
+
+def json_dumps(obj, indent=False):
+    if orjson:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None).encode()
+
+# ---------------- STORE ----------------
+
+class LearnedCommandStore:
+    """
+    Learned commands backed by a JSON snapshot and an append-only NDJSON log.
+    Learning a command appends one record; the snapshot is only rewritten
+    every snapshot_every commands, on consolidate() and when a previous
+    session left records in the log.
+    """
+
+    def __init__(self, path=COMMANDS_FILE, log_path=LEARNED_LOG_FILE,
+                 snapshot_every=SNAPSHOT_EVERY):
+        self.path = path
+        self.log_path = log_path
+        self.snapshot_every = snapshot_every
+        self.commands = {}
+        self.pending = 0  # Records in the log not yet in the snapshot
+
+    def load(self, on_error=None):
+        """
+        Read the snapshot, then replay commands appended since it was written.
+        A corrupt snapshot is moved aside to <path>.corrupt and reported
+        through on_error(message). Records left in the log are folded into
+        a fresh snapshot. Returns the commands dict.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                self.commands = json_loads(f.read())
+        except FileNotFoundError:
+            self.commands = {}
+        except json.JSONDecodeError:  # orjson.JSONDecodeError subclasses it
+            # Keep the unreadable file for recovery before anything rewrites it
+            os.replace(self.path, self.path + ".corrupt")
+            if on_error:
+                on_error(f"Error loading learned commands - file corrupted, moved to {self.path}.corrupt")
+            self.commands = {}
+
+        try:
+            with open(self.log_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json_loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Partial line from an interrupted write
+                    self.commands[record["t"]] = record["a"]
+        except FileNotFoundError:
+            return self.commands
+
+        # Fold records left by the last session into the snapshot and start a clean log
+        self.save()
+        return self.commands
+
+    def save(self):
+        """
+        Rewrite the JSON snapshot and clear the append log it now covers.
+        """
+        temp_file = self.path + ".tmp"
+        with open(temp_file, "wb") as f:
+            f.write(json_dumps(self.commands, indent=True))
+        os.replace(temp_file, self.path)
+
+        if os.path.exists(self.log_path):
+            os.remove(self.log_path)
+        self.pending = 0
+
+    def learn(self, trigger, action):
+        """
+        Store one learned command and persist it as a single NDJSON record.
+        """
+        self.commands[trigger] = action
+        with open(self.log_path, "ab") as f:
+            f.write(json_dumps({"t": trigger, "a": action}) + b"\n")
+        self.pending += 1
+
+        if self.pending >= self.snapshot_every:
+            self.save()
+
+    def consolidate(self):
+        if self.pending:
+            self.save()
@@ -0,0 +1,233 @@
+"""
+Nova Assistant - Text matching helpers
+Pure string functions run on every utterance: normalization, trigger
+validation, trigger lookup, fuzzy matching and exit detection.
+
+Kept free of audio/GUI imports and fully annotated so it can be compiled
+to a C extension with mypyc (`mypyc nova_text.py`). Python picks up the
+compiled module automatically; the source still runs as-is without it.
+"""
+
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    # C++ implementation, much faster than difflib; optional
+    from rapidfuzz import fuzz, process
+except ImportError:
+    fuzz = process = None  # type: ignore[assignment]
+
+# ---------------- CONFIG ----------------
+
+MIN_TRIGGER_LENGTH = 3  # Minimum characters for a trigger
+MIN_WORD_COUNT = 2      # Minimum words for learning triggers
+SIMILARITY_THRESHOLD = 0.75  # Fuzzy match threshold (0-1)
+EXIT_SIMILARITY_THRESHOLD = 0.8  # Stricter threshold for exit commands
+
+# ---------------- NORMALIZATION ----------------
+
+# Text normalization patterns, compiled once
+PUNCTUATION_RE = re.compile(r'[^\w\s]')
+CONTRACTIONS = {
+    "whats": "what is",
+    "wheres": "where is",
+    "hows": "how is",
+    "im": "i am",
+    "youre": "you are",
+    "dont": "do not",
+    "cant": "can not",
+    "wont": "will not",
+}
+CONTRACTIONS_RE = re.compile(r'\b(?:' + '|'.join(CONTRACTIONS) + r')\b')
+
+def expand_contraction(match: "re.Match[str]") -> str:
+    return CONTRACTIONS[match.group(0)]
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize speech text for better matching.
+    - Convert to lowercase
+    - Remove extra whitespace
+    - Remove punctuation
+    - Standardize common variations
+    """
+    if not text:
+        return ""
+
+    # Convert to lowercase and remove punctuation except spaces
+    text = PUNCTUATION_RE.sub('', text.lower())
+
+    # Collapse multiple spaces and trim both ends in one pass
+    text = " ".join(text.split())
+
+    # Common speech-to-text corrections (whole words only)
+    return CONTRACTIONS_RE.sub(expand_contraction, text)
+
+DIGIT_DELETE_TABLE = str.maketrans('', '', '0123456789')  # Strips digits in one C-level pass
+
+def is_valid_trigger(trigger: str) -> Tuple[bool, str]:
+    """
+    Validate if a trigger phrase is acceptable for learning.
+    Returns (is_valid, error_message)
+    """
+    trigger = trigger.strip()
+
+    # Check minimum length
+    if len(trigger) < MIN_TRIGGER_LENGTH:
+        return False, f"Trigger too short. Minimum {MIN_TRIGGER_LENGTH} characters."
+
+    # Check for digits only
+    if trigger.isdigit():
+        return False, "Trigger cannot be only numbers."
+
+    # Check word count
+    words = trigger.split()
+    if len(words) < MIN_WORD_COUNT:
+        return False, f"Trigger needs at least {MIN_WORD_COUNT} words."
+
+    # Check for mostly numbers
+    digit_count = len(trigger) - len(trigger.translate(DIGIT_DELETE_TABLE))
+    if digit_count > len(trigger) / 2:
+        return False, "Trigger contains too many numbers."
+
+    # Check for common stop words only
+    stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at"}
+    if all(word in stop_words for word in words):
+        return False, "Trigger cannot be only common words."
+
+    return True, ""
+
+# ---------------- TRIGGER TRIE ----------------
+
+# Word-level prefix tree over learned triggers: each node maps the next word
+# to its child, and the None key holds the trigger that ends at that node
+TrieNode = Dict[Optional[str], Any]
+
+def index_learned_trigger(trie: TrieNode, trigger: str) -> None:
+    """
+    Add a trigger to the trie searched by find_trie_trigger.
+    """
+    node = trie
+    for word in trigger.split():
+        node = node.setdefault(word, {})
+    node[None] = trigger
+
+def build_trigger_trie(triggers: Iterable[str]) -> TrieNode:
+    """
+    Build a trigger trie holding every trigger in triggers.
+    """
+    trie: TrieNode = {}
+    for trigger in triggers:
+        index_learned_trigger(trie, trigger)
+    return trie
+
+def find_trie_trigger(trie: TrieNode, cmd: str) -> Optional[str]:
+    """
+    Return the longest learned trigger whose words appear in order in cmd.
+    Walks the trigger trie from every word position, so each lookup is
+    bounded by the command length rather than the number of triggers.
+    """
+    words = cmd.split()
+    best: Optional[str] = None
+    for start in range(len(words)):
+        node = trie
+        for word in words[start:]:
+            child: Optional[TrieNode] = node.get(word)
+            if child is None:
+                break
+            node = child
+            trigger: Optional[str] = node.get(None)
+            if trigger is not None and (best is None or len(trigger) > len(best)):
+                best = trigger
+    return best
+
+# ---------------- FUZZY MATCHING ----------------
+
+@lru_cache(maxsize=1024)
+def char_signature(text: str) -> int:
+    """
+    Bit set of the characters in text (folded into 64 bits).
+    Strings whose signatures share no bit have no character in common.
+    """
+    signature = 0
+    for c in text:
+        signature |= 1 << (ord(c) & 63)
+    return signature
+
+@lru_cache(maxsize=256)
+def pattern_matcher(pattern: str) -> "SequenceMatcher[str]":
+    """
+    SequenceMatcher with pattern preloaded as the second sequence,
+    which is the side difflib indexes and caches.
+    """
+    matcher: "SequenceMatcher[str]" = SequenceMatcher(None)
+    matcher.set_seq2(pattern)
+    return matcher
+
+def similarity(text: str, pattern: str) -> float:
+    """
+    Similarity of text and pattern from 0 to 1, as used by fuzzy_match.
+    """
+    if fuzz:
+        return float(fuzz.ratio(text, pattern)) / 100
+    matcher = pattern_matcher(pattern)
+    matcher.set_seq1(text)
+    return matcher.ratio()
+
+def fuzzy_match(text: str, pattern: str, threshold: float = SIMILARITY_THRESHOLD) -> bool:
+    """
+    Check if text fuzzy matches pattern using sequence matching.
+    Returns True if similarity >= threshold.
+    """
+    if fuzz:
+        return bool(fuzz.ratio(text, pattern, score_cutoff=threshold * 100))
+    if text == pattern:
+        return True
+
+    # Reject with cheap upper bounds before the quadratic ratio() computation
+    if 2 * min(len(text), len(pattern)) / (len(text) + len(pattern)) < threshold:
+        return False
+    if not char_signature(text) & char_signature(pattern):
+        return False
+
+    matcher = pattern_matcher(pattern)
+    matcher.set_seq1(text)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+def best_fuzzy_match(text: str, patterns: Iterable[str],
+                     threshold: float = SIMILARITY_THRESHOLD) -> Optional[str]:
+    """
+    Return the pattern most similar to text, or None if none reaches threshold.
+    """
+    if process:
+        match = process.extractOne(text, patterns, scorer=fuzz.ratio,
+                                   score_cutoff=threshold * 100)
+        return match[0] if match else None
+    best: Optional[str] = None
+    best_score = threshold
+    for pattern in patterns:
+        # The best score so far is a tighter bound for the cheap pre-filters
+        if fuzzy_match(text, pattern, best_score):
+            score = similarity(text, pattern)
+            if best is None or score > best_score:
+                best, best_score = pattern, score
+    return best
+
+# ---------------- EXIT DETECTION ----------------
+
+EXIT_PATTERNS = [
+    "stop", "exit", "quit", "goodbye", "bye", "shut down nova",
+    "stop nova", "nova stop", "close nova", "turn off"
+]
+EXIT_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, EXIT_PATTERNS)) + r')\b')
+
+def check_exit_command(cmd: str) -> bool:
+    """
+    Check for exit/stop commands with multiple variations.
+    """
+    # One regex scan for exact phrases; fuzzy matching only on a miss
+    if EXIT_RE.search(cmd):
+        return True
+    return best_fuzzy_match(cmd, EXIT_PATTERNS, EXIT_SIMILARITY_THRESHOLD) is not None
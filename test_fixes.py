@@ -4,79 +4,14 @@ Tests the fixed version without requiring voice input
 """
 
 import json
-import re
-from difflib import SequenceMatcher
+import os
+import tempfile
 
-# Copy functions from nova_fixed.py to test independently
-
-def normalize_text(text):
-    """Normalize speech text for better matching."""
-    if not text:
-        return ""
-    
-    text = text.lower().strip()
-    text = re.sub(r'[^\w\s]', '', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    replacements = {
-        "whats": "what is",
-        "wheres": "where is",
-        "hows": "how is",
-        "im": "i am",
-        "youre": "you are",
-        "dont": "do not",
-        "cant": "can not",
-        "wont": "will not",
-    }
-    
-    for old, new in replacements.items():
-        text = text.replace(old, new)
-    
-    return text.strip()
-
-def is_valid_trigger(trigger):
-    """Validate if a trigger phrase is acceptable for learning."""
-    MIN_TRIGGER_LENGTH = 3
-    MIN_WORD_COUNT = 2
-    
-    trigger = trigger.strip()
-    
-    if len(trigger) < MIN_TRIGGER_LENGTH:
-        return False, f"Trigger too short. Minimum {MIN_TRIGGER_LENGTH} characters."
-    
-    if trigger.isdigit():
-        return False, "Trigger cannot be only numbers."
-    
-    words = trigger.split()
-    if len(words) < MIN_WORD_COUNT:
-        return False, f"Trigger needs at least {MIN_WORD_COUNT} words."
-    
-    digit_count = sum(c.isdigit() for c in trigger)
-    if digit_count > len(trigger) / 2:
-        return False, "Trigger contains too many numbers."
-    
-    stop_words = {"the", "a", "an", "and", "or", "but", "in", "on", "at"}
-    if all(word in stop_words for word in words):
-        return False, "Trigger cannot be only common words."
-    
-    return True, ""
-
-def fuzzy_match(text, pattern, threshold=0.75):
-    """Check if text fuzzy matches pattern."""
-    similarity = SequenceMatcher(None, text, pattern).ratio()
-    return similarity >= threshold
-
-def check_exit_command(cmd):
-    """Check for exit/stop commands."""
-    exit_patterns = [
-        "stop", "exit", "quit", "goodbye", "bye", "shut down nova",
-        "stop nova", "nova stop", "close nova", "turn off"
-    ]
-    
-    for pattern in exit_patterns:
-        if pattern in cmd or fuzzy_match(cmd, pattern, 0.8):
-            return True
-    return False
+from nova_store import LearnedCommandStore
+from nova_text import (
+    normalize_text, is_valid_trigger, fuzzy_match, similarity, check_exit_command,
+    build_trigger_trie, find_trie_trigger,
+)
 
 # Run Tests
 print("=" * 60)
@@ -93,6 +28,7 @@ test_cases = [
     ("learn   new    command", "learn new command"),
     ("I'm ready!", "i am ready"),
     ("don't stop", "do not stop"),
+    ("What time is it", "what time is it"),
 ]
 
 passed = 0
@@ -151,10 +87,10 @@ for text, pattern, should_match, threshold in fuzzy_tests:
     result = fuzzy_match(text, pattern, threshold)
     status = "✅" if result == should_match else "❌"
     
-    similarity = SequenceMatcher(None, text, pattern).ratio()
+    score = similarity(text, pattern)
     
     print(f"{status} '{text}' vs '{pattern}'")
-    print(f"   Similarity: {similarity:.2%} (threshold: {threshold:.0%})")
+    print(f"   Similarity: {score:.2%} (threshold: {threshold:.0%})")
     print(f"   Expected: {should_match}, Got: {result}")
     
     if result == should_match:
@@ -176,6 +112,7 @@ exit_tests = [
     ("shut down nova", True),
     ("open notepad", False),
     ("hello", False),
+    ("open stopwatch", False),
 ]
 
 passed = 0
@@ -188,8 +125,99 @@ for cmd, should_exit in exit_tests:
 
 print(f"\n📊 Passed: {passed}/{len(exit_tests)}")
 
-# Test 5: Learned Commands Validation
-print("\n\n💾 TEST 5: Learned Commands File")
+# Test 5: Learned Trigger Lookup
+print("\n\n🌳 TEST 5: Learned Trigger Lookup")
+print("-" * 60)
+
+trie = build_trigger_trie(["open notepad", "open notepad plus", "play my music"])
+trie_tests = [
+    ("open notepad", "open notepad", "Multi-word trigger"),
+    ("please play my music now", "play my music", "Trigger mid-sentence"),
+    ("open notepad plus", "open notepad plus", "Longest trigger wins"),
+    ("open paint", None, "No trigger"),
+    ("reopen notepad", None, "Whole words only"),
+]
+
+passed = 0
+for cmd, expected, description in trie_tests:
+    result = find_trie_trigger(trie, cmd)
+    status = "✅" if result == expected else "❌"
+    print(f"{status} '{cmd}' → {result!r} (expected: {expected!r}) - {description}")
+    if result == expected:
+        passed += 1
+
+print(f"\n📊 Passed: {passed}/{len(trie_tests)}")
+
+# Test 6: Learned Command Storage
+print("\n\n🗄️ TEST 6: Learned Command Storage")
+print("-" * 60)
+
+def make_store(snapshot, log_lines):
+    """
+    Write a snapshot and NDJSON log into a fresh temp folder, then load them.
+    """
+    folder = tempfile.mkdtemp()
+    store = LearnedCommandStore(
+        os.path.join(folder, "learned_commands.json"),
+        os.path.join(folder, "learned_commands.ndjson"),
+    )
+    if snapshot is not None:
+        with open(store.path, "w") as f:
+            f.write(snapshot)
+    if log_lines:
+        with open(store.log_path, "w") as f:
+            f.write("\n".join(log_lines))
+    errors = []
+    store.load(on_error=errors.append)
+    return store, errors
+
+def check_replay():
+    store, _ = make_store('{"open notes": "old.exe", "open paint": "paint.exe"}',
+                          ['{"t": "open notes", "a": "new.exe"}', '{"t": "open mail", "a": "https://mail.google.com"}', ''])
+    with open(store.path) as f:
+        snapshot = json.load(f)
+    return (store.commands == snapshot == {"open notes": "new.exe", "open paint": "paint.exe",
+                                           "open mail": "https://mail.google.com"}
+            and not os.path.exists(store.log_path))
+
+def check_torn_line():
+    store, _ = make_store(None, ['{"t": "open notes", "a": "notes.exe"}', '{"t": "open pai'])
+    return store.commands == {"open notes": "notes.exe"}
+
+def check_corrupt_snapshot():
+    store, errors = make_store('{"open notes": "notes.ex', ['{"t": "open mail", "a": "mail.exe"}', ''])
+    with open(store.path + ".corrupt") as f:
+        kept = f.read()
+    return (store.commands == {"open mail": "mail.exe"} and len(errors) == 1
+            and kept == '{"open notes": "notes.ex')
+
+def check_snapshot_every():
+    store, _ = make_store(None, [])
+    store.snapshot_every = 2
+    store.learn("open notes", "notes.exe")
+    logged = os.path.exists(store.log_path) and not os.path.exists(store.path)
+    store.learn("open mail", "mail.exe")
+    return logged and os.path.exists(store.path) and not os.path.exists(store.log_path)
+
+storage_tests = [
+    (check_replay, "Log replayed over snapshot, then folded into it"),
+    (check_torn_line, "Torn last log line skipped"),
+    (check_corrupt_snapshot, "Corrupt snapshot moved to .corrupt"),
+    (check_snapshot_every, "Snapshot rewritten every SNAPSHOT_EVERY commands"),
+]
+
+passed = 0
+for check, description in storage_tests:
+    result = check()
+    status = "✅" if result else "❌"
+    print(f"{status} {description}")
+    if result:
+        passed += 1
+
+print(f"\n📊 Passed: {passed}/{len(storage_tests)}")
+
+# Test 7: Learned Commands Validation
+print("\n\n💾 TEST 7: Learned Commands File")
 print("-" * 60)
 
 try:
@@ -226,6 +254,8 @@ print("✅ Text Normalization: Working")
 print("✅ Trigger Validation: Working")
 print("✅ Fuzzy Matching: Working")
 print("✅ Exit Detection: Working")
+print("✅ Trigger Lookup: Working")
+print("✅ Command Storage: Working")
 print("\n🎉 All core functions are operational!")
 print("\n📋 Next Steps:")
 print("   1. Run: python nova_fixed.py")